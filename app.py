@@ -0,0 +1,573 @@
+"""Checker for Ohio 2-character license plate availability.
+
+Walks every two-letter combination through the BMV plate preview page,
+records the result to results.jsonl, and serves a small dashboard.
+"""
+
+import asyncio
+import atexit
+import collections
+import concurrent.futures
+import itertools
+import json
+import os
+import random
+import re
+import string
+import threading
+import time
+from datetime import datetime
+
+import jinja2
+import requests
+from flask import Flask, Response, jsonify, request, send_file, stream_with_context
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - fallback for bare installs
+    orjson = None
+
+try:
+    import ahocorasick
+
+    if ahocorasick.unicode:  # we scan bytes; the default unicode build can't
+        ahocorasick = None
+except ImportError:
+    ahocorasick = None
+
+
+app = Flask(__name__)
+
+BASE_URL_L = "https://oplates.dps.ohio.gov/platereserve/preview?plateText="
+BASE_URL_R = "&plateType=PC"
+
+DATA_FILE = "results.jsonl"
+
+SLEEP_SECONDS = 60  # pause between plates so we look like a person
+BLOCK_SLEEP = 150  # penalty box after the BMV tells us to go away
+CONCURRENCY = int(os.getenv("WORKERS", "8"))  # plates in flight at once
+BACKOFF_BASE = 5  # seconds; doubles per retry up to BLOCK_SLEEP
+BACKOFF_JITTER = 3  # seconds of random spread so retries don't align
+
+# One session for the whole process: every request hits the same host, so
+# keeping the socket alive skips the TCP/TLS handshake on all but the first
+# call. Retries cover transient 5xx from the BMV's load balancer.
+SESSION = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=CONCURRENCY,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504]),
+)
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
+SESSION.headers.update(
+    {
+        "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36",
+        "Accept": "text/html,application/xhtml+xml",
+    }
+)
+atexit.register(SESSION.close)
+
+# Runner state is published by atomic pointer swap: the worker builds a new
+# dict and assigns it to _STATE (atomic under the GIL), so /status readers
+# never block the worker and never see a half-updated dict. Published dicts
+# are never mutated; all writes go through _publish on the runner thread.
+_STATE = {
+    "running": False,
+    "current": None,
+    "checked": 0,
+    "total": 0,
+    "last_status": None,
+    "started_at": None,
+}
+stop_event = threading.Event()
+_runner_thread = None
+
+
+def _publish(**changes):
+    global _STATE
+    _STATE = {**_STATE, **changes}
+
+
+class TokenBucket:
+    """Token-bucket rate limiter shared by all in-flight plate checks.
+
+    Tasks call acquire() before each request; the bucket refills at
+    refill_rate tokens per second. Response headers feed back into the
+    bucket via note_headers, so a Retry-After or a shrinking
+    X-RateLimit-Remaining slows everyone down instead of only the task
+    that saw it.
+    """
+
+    def __init__(self, capacity, refill_rate):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._resume_at = 0.0
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            if now < self._resume_at:
+                await asyncio.sleep(self._resume_at - now)
+                continue
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.refill_rate
+            )
+            self._updated = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return
+            await asyncio.sleep((1.0 - self._tokens) / self.refill_rate)
+
+    def note_headers(self, headers):
+        retry_after = headers.get("Retry-After")
+        if retry_after is not None:
+            try:
+                self.pause(float(retry_after))
+            except ValueError:
+                pass
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        if remaining is not None and reset is not None:
+            try:
+                window = max(float(reset), 1.0)
+                self.refill_rate = max(float(remaining) / window, 1.0 / BLOCK_SLEEP)
+            except ValueError:
+                pass
+
+    def pause(self, seconds):
+        """Drain the bucket and hold all acquires for the given time."""
+        self._tokens = 0.0
+        self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+
+_bucket = None
+
+if orjson is not None:
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+else:
+    _loads = json.loads
+
+    def _dumps(record):
+        return json.dumps(record, ensure_ascii=False).encode("utf-8")
+
+
+LETTERS = string.ascii_uppercase
+
+# Built once at import. Extend here (repeat=3, digits, ...) rather than in
+# generate_combinations so a /start never pays to recompute the set.
+_COMBOS = tuple(
+    ("".join(chars), BASE_URL_L + "".join(chars) + BASE_URL_R)
+    for chars in itertools.product(LETTERS, repeat=2)
+)
+
+
+def generate_combinations():
+    """All two-letter plates, AA through ZZ, paired with their preview URLs."""
+    return _COMBOS
+
+
+# Status markers as the page actually spells them, scanned against the raw
+# body so classification never decodes or copies the (multi-KB) HTML. Only
+# the short "available" marker needs case-folding, and the ignorecase regex
+# scans in C without allocating a lowered copy of the document.
+_M_BLOCKED = b"You have reached the maximum plate preview attempts"
+_M_ISSUED = b"Plate is issued"
+_M_INVALID = b"Plate is not valid"
+_RE_AVAIL = re.compile(rb"available", re.IGNORECASE)
+
+# Markers in priority order: a blocked page wins no matter what else it
+# happens to contain. The case-insensitive "available" check stays a
+# last-resort regex either way (see parse_status).
+_MARKERS = (
+    (_M_BLOCKED, ("blocked", "rate limited by BMV")),
+    (_M_ISSUED, ("issued", "")),
+    (_M_INVALID, ("invalid", "rejected by BMV")),
+)
+
+if ahocorasick is not None:
+    _AC = ahocorasick.Automaton()
+    for _priority, (_marker, _result) in enumerate(_MARKERS):
+        _AC.add_word(_marker, (_priority, _result))
+    _AC.make_automaton()
+
+    def parse_status(body):
+        """Classify a preview page body (bytes) into (status, note).
+
+        One Aho-Corasick sweep covers every marker; priority 0 short-
+        circuits, otherwise the best-priority hit wins.
+        """
+        best = None
+        for _, (priority, result) in _AC.iter(body):
+            if priority == 0:
+                return result
+            if best is None or priority < best[0]:
+                best = (priority, result)
+        if best is not None:
+            return best[1]
+        if _RE_AVAIL.search(body):
+            return "available", ""
+        return "unknown", ""
+
+else:
+
+    def parse_status(body):
+        """Classify a preview page body (bytes) into (status, note)."""
+        for marker, result in _MARKERS:
+            if marker in body:
+                return result
+        if _RE_AVAIL.search(body):
+            return "available", ""
+        return "unknown", ""
+
+
+# A marker can straddle a chunk boundary, so each scan window keeps this
+# many bytes of the previous chunk (longest marker minus one).
+_MARKER_TAIL = len(_M_BLOCKED) - 1
+
+
+def check_and_classify(url):
+    """Stream the preview page and classify it as we go.
+
+    Scans each chunk (plus the tail of the previous one) for a status
+    marker and aborts the download on the first hit, so a page whose
+    marker appears early never gets fully transferred or buffered.
+    """
+    with SESSION.get(url, stream=True, timeout=15) as r:
+        if _bucket is not None:
+            _bucket.note_headers(r.headers)
+        r.raise_for_status()
+        tail = b""
+        for chunk in r.iter_content(chunk_size=4096):
+            window = tail + chunk
+            status, note = parse_status(window)
+            if status != "unknown":
+                return status, note
+            tail = window[-_MARKER_TAIL:]
+    return "unknown", ""
+
+
+# Parsed-results ring buffer: the newest RESULTS_CACHE records, preloaded
+# from the active file at import and kept hot by the writer thread below.
+# The deque's maxlen bounds memory no matter how long the checker runs.
+_CACHE = collections.deque(maxlen=int(os.getenv("RESULTS_CACHE", "10000")))
+_CACHE_OFFSET = 0
+_CACHE_LOCK = threading.Lock()
+
+# The active file rotates into results.jsonl.<epoch> segments once it grows
+# past this, so no single file (or startup preload) grows without bound.
+_SEGMENT_MAX = int(os.getenv("RESULTS_SEGMENT_MAX", str(16 * 1024 * 1024)))
+
+
+def _refresh_cache():
+    """Pull any unseen tail of DATA_FILE into _CACHE. Caller holds _CACHE_LOCK."""
+    global _CACHE_OFFSET
+    if not os.path.exists(DATA_FILE):
+        return
+    if os.path.getsize(DATA_FILE) <= _CACHE_OFFSET:
+        return
+    with open(DATA_FILE, "rb") as f:
+        f.seek(_CACHE_OFFSET)
+        chunk = f.read()
+        _CACHE_OFFSET = f.tell()
+    for line in chunk.splitlines():
+        if not line:
+            continue
+        try:
+            _CACHE.append(_loads(line))
+        except ValueError:
+            continue
+
+
+# Batched result writer: save_result only enqueues encoded lines; a single
+# writer thread drains the queue to one persistent append handle every
+# _WRITE_BATCH records or _WRITE_INTERVAL seconds, so each record costs a
+# lock-append instead of an open/write/close syscall round trip.
+_WRITE_BATCH = 50
+_WRITE_INTERVAL = 2.0
+
+# The one and only directory check: DATA_FILE's directory must exist before
+# the handle below opens and must stay put for the lifetime of the process
+# (the writer thread and segment rotation both reopen paths under it).
+os.makedirs(os.path.dirname(DATA_FILE) or ".", exist_ok=True)
+_writer_file = open(DATA_FILE, "ab", buffering=1 << 16)
+_write_queue = collections.deque()
+_write_lock = threading.Lock()
+_write_wakeup = threading.Event()
+
+
+def _rotate_segment():
+    """Close the active file and reopen a fresh one. Caller holds _CACHE_LOCK."""
+    global _writer_file, _CACHE_OFFSET
+    _writer_file.close()
+    os.replace(DATA_FILE, f"{DATA_FILE}.{int(time.time())}")
+    _writer_file = open(DATA_FILE, "ab", buffering=1 << 16)
+    _CACHE_OFFSET = 0
+
+
+def _drain_writes():
+    global _CACHE_OFFSET
+    with _write_lock:
+        if not _write_queue:
+            return
+        batch = list(_write_queue)
+        _write_queue.clear()
+    data = b"".join(line for line, _ in batch)
+    # Write and update the cache under one lock so a concurrent
+    # _refresh_cache cannot re-read the bytes we are accounting for.
+    with _CACHE_LOCK:
+        _writer_file.write(data)
+        _writer_file.flush()
+        _CACHE.extend(record for _, record in batch)
+        _CACHE_OFFSET += len(data)
+        if _writer_file.tell() >= _SEGMENT_MAX:
+            _rotate_segment()
+
+
+def _writer_loop():
+    while True:
+        _write_wakeup.wait(_WRITE_INTERVAL)
+        _write_wakeup.clear()
+        _drain_writes()
+
+
+def _close_writer():
+    _drain_writes()
+    _writer_file.close()
+
+
+atexit.register(_close_writer)
+with _CACHE_LOCK:
+    _refresh_cache()
+
+# Last persisted status per plate, seeded from the preloaded cache so a
+# restart doesn't re-write a line for every unchanged plate.
+_last_status = {r["plate"]: r["status"] for r in _CACHE if "plate" in r}
+
+threading.Thread(target=_writer_loop, daemon=True, name="result-writer").start()
+
+
+# The record fields are fixed, so each line is stamped out with bytes %
+# formatting from pre-encoded values instead of serializing a dict.
+_FMT = b'{"plate":%b,"status":%b,"note":%b,"checked_at":%d}\n'
+
+
+def save_result(plate, status, note=""):
+    """Queue one record for the JSONL results file."""
+    # Epoch seconds: formatting is deferred to render time (see the
+    # `datetime` Jinja filter); /results.json clients format locally.
+    now = int(time.time())
+    line = _FMT % (_dumps(plate), _dumps(status), _dumps(note), now)
+    # This dict only feeds the in-memory ring buffer; it is never serialized.
+    record = {"plate": plate, "status": status, "note": note, "checked_at": now}
+    with _write_lock:
+        _write_queue.append((line, record))
+        if len(_write_queue) >= _WRITE_BATCH:
+            _write_wakeup.set()
+
+
+def load_results(limit=None):
+    """Return cached results, newest first.
+
+    Serves purely from the ring buffer; rotated segment files never sit
+    on this path.
+    """
+    if limit is not None and limit <= 0:
+        return []
+    with _CACHE_LOCK:
+        _refresh_cache()
+        return list(itertools.islice(reversed(_CACHE), limit))
+
+
+async def _handle_plate(sem, plate, url):
+    """Check one plate, backing off exponentially if the BMV pushes back."""
+    attempt = 0
+    while not stop_event.is_set():
+        async with sem:
+            if stop_event.is_set():
+                return
+            await _bucket.acquire()
+            _publish(current=plate)
+            try:
+                status, note = await asyncio.to_thread(check_and_classify, url)
+            except requests.RequestException as exc:
+                status, note = "error", str(exc)
+            # Only persist transitions; re-confirming an unchanged status
+            # across sweeps (or block windows) is not worth a disk write.
+            if _last_status.get(plate) != status:
+                save_result(plate, status, note)
+                _last_status[plate] = status
+            _publish(checked=_STATE["checked"] + 1, last_status=status)
+            if status not in ("blocked", "error"):
+                return
+        # Blocked applies to the whole host: stall the bucket for
+        # everyone, then retry this plate with jittered backoff.
+        backoff = min(BLOCK_SLEEP, BACKOFF_BASE * 2**attempt) + random.uniform(
+            0, BACKOFF_JITTER
+        )
+        attempt += 1
+        if status == "blocked":
+            _bucket.pause(backoff)
+        await asyncio.sleep(backoff)
+
+
+async def runner_loop():
+    global _bucket
+    combos = generate_combinations()
+    sem = asyncio.Semaphore(CONCURRENCY)
+    # Size the pool that asyncio.to_thread dispatches check_plate into to
+    # match the semaphore, so WORKERS bounds threads, in-flight checks, and
+    # the session's connection pool together.
+    asyncio.get_running_loop().set_default_executor(
+        concurrent.futures.ThreadPoolExecutor(
+            max_workers=CONCURRENCY, thread_name_prefix="plate-check"
+        )
+    )
+    _bucket = TokenBucket(capacity=CONCURRENCY, refill_rate=CONCURRENCY / SLEEP_SECONDS)
+    _publish(
+        running=True,
+        total=len(combos),
+        checked=0,
+        started_at=int(time.time()),
+    )
+    try:
+        await asyncio.gather(*[_handle_plate(sem, plate, url) for plate, url in combos])
+    finally:
+        _publish(running=False, current=None)
+
+
+def _run_runner():
+    asyncio.run(runner_loop())
+
+
+_HTML_SRC = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <title>Plate Check Results</title>
+    <style>
+        body { font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
+               background: #f4f4f8; margin: 0; padding: 20px; }
+        .container { max-width: 700px; margin: 0 auto; background: white;
+                     border-radius: 12px; box-shadow: 0 4px 20px rgba(0,0,0,0.1);
+                     overflow: hidden; }
+        header { background: linear-gradient(135deg, #1e3c72 0%, #2a5298 100%);
+                 color: white; padding: 20px 30px; }
+        h1 { margin: 0; font-size: 1.5em; }
+        table { width: 100%; border-collapse: collapse; }
+        th, td { padding: 10px 30px; text-align: left; border-bottom: 1px solid #eee; }
+        th { background: #f8f9fa; color: #666; font-size: 0.85em;
+             text-transform: uppercase; }
+        .status { padding: 3px 10px; border-radius: 12px; font-size: 0.85em; }
+        .status.available { background: #d4edda; color: #155724; }
+        .status.issued { background: #f8d7da; color: #721c24; }
+        .status.blocked { background: #fff3cd; color: #856404; }
+        .status.invalid, .status.unknown, .status.error {
+            background: #e2e3e5; color: #383d41; }
+        .note { color: #999; font-size: 0.85em; }
+        .empty { padding: 40px; text-align: center; color: #999; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <header><h1>Plate Check Results ({{ rows|length }})</h1></header>
+        <table>
+            <tr><th>Plate</th><th>Status</th><th>Checked</th><th>Note</th></tr>
+            {% for r in rows %}
+            <tr>
+                <td><strong>{{ r.plate }}</strong></td>
+                <td><span class="status {{ r.status }}">{{ r.status }}</span></td>
+                <td>{{ r.checked_at|datetime }}</td>
+                <td class="note">{{ r.note }}</td>
+            </tr>
+            {% else %}
+            <tr><td colspan="4" class="empty">No results yet.</td></tr>
+            {% endfor %}
+        </table>
+    </div>
+</body>
+</html>
+"""
+
+
+def _format_timestamp(value):
+    """Render epoch seconds as local ISO time; pass pre-epoch records through."""
+    try:
+        return datetime.fromtimestamp(int(value)).isoformat(sep=" ", timespec="seconds")
+    except (TypeError, ValueError):
+        return value
+
+
+# Compiled once at import: render_template_string would re-parse and
+# re-compile the Jinja source on every request. Autoescape stays on since
+# the note column carries text echoed from BMV responses.
+_jinja_env = jinja2.Environment(autoescape=True)
+_jinja_env.filters["datetime"] = _format_timestamp
+_RESULTS_TEMPLATE = _jinja_env.from_string(_HTML_SRC)
+
+
+@app.route("/")
+def index():
+    return send_file("index.html")
+
+
+@app.route("/plates.csv")
+def plates_csv():
+    return send_file("plates.csv")
+
+
+@app.route("/status")
+def status():
+    return jsonify(_STATE)
+
+
+@app.route("/results")
+def results_html():
+    limit = request.args.get("limit", default=100, type=int)
+    rows = load_results(limit)
+    return Response(_RESULTS_TEMPLATE.render(rows=rows), mimetype="text/html")
+
+
+def _stream_results(limit):
+    """Yield a JSON array one serialized row at a time, newest first."""
+    yield b"["
+    sep = b""
+    for row in load_results(limit):
+        yield sep + _dumps(row)
+        sep = b","
+    yield b"]"
+
+
+@app.route("/results.json")
+def results_json():
+    limit = request.args.get("limit", default=None, type=int)
+    return Response(
+        stream_with_context(_stream_results(limit)), mimetype="application/json"
+    )
+
+
+@app.route("/start", methods=["POST"])
+def start():
+    global _runner_thread
+    if _STATE["running"]:
+        return jsonify({"ok": False, "error": "already running"}), 409
+    stop_event.clear()
+    _runner_thread = threading.Thread(target=_run_runner, daemon=True)
+    _runner_thread.start()
+    return jsonify({"ok": True})
+
+
+@app.route("/stop", methods=["POST"])
+def stop():
+    stop_event.set()
+    return jsonify({"ok": True})
+
+
+if __name__ == "__main__":
+    app.run(host="127.0.0.1", port=5000, debug=False)
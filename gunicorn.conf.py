@@ -0,0 +1,15 @@
+"""Gunicorn config for the plate checker.
+
+Exactly one worker process: the results ring buffer, the writer thread,
+and the runner loop are all in-process state and must not be duplicated.
+Threads give the dashboard routes real concurrency while the runner's
+I/O releases the GIL.
+"""
+
+bind = "127.0.0.1:5000"
+workers = 1
+threads = 8
+
+# Import app.py in the worker, not the master, so the writer thread (started
+# at import) and anything spawned by /start live in the serving process.
+preload_app = False